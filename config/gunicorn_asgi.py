@@ -0,0 +1,34 @@
+# Perfil ASGI: gunicorn administra los procesos y cada worker corre un event loop de uvicorn.
+# Las vistas públicas async (inicio, catálogo, detalle, contacto) atienden muchas
+# peticiones concurrentes por worker mientras esperan a la BD o al SMTP.
+#
+#   gunicorn -c config/gunicorn_asgi.py
+#
+# Variables: GUNICORN_BIND (por defecto 0.0.0.0:8000) y WEB_CONCURRENCY (workers).
+import multiprocessing
+import os
+import time
+
+wsgi_app = 'config.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Un event loop por núcleo: la concurrencia la da el loop, no la cantidad de procesos
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+# Recicla workers de a poco para acotar fugas de memoria sin reiniciarlos todos juntos
+max_requests = 2000
+max_requests_jitter = 200
+
+
+def post_fork(server, worker):
+    worker.inicio_arranque = time.perf_counter()
+
+
+def post_worker_init(worker):
+    # La app ya está cargada: precarga plantillas, URLs, UF y facetas antes de
+    # aceptar la primera petición, y deja en el log cuánto tardó cada etapa.
+    from propiedades.arranque import calentar_worker
+    calentar_worker(worker)
@@ -0,0 +1,29 @@
+# Perfil WSGI clásico (workers síncronos), usado como referencia en `manage.py prueba_carga`.
+#
+#   gunicorn -c config/gunicorn_wsgi.py
+import multiprocessing
+import os
+import time
+
+wsgi_app = 'config.wsgi:application'
+worker_class = 'sync'
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Cada worker atiende una petición a la vez
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+max_requests = 2000
+max_requests_jitter = 200
+
+
+def post_fork(server, worker):
+    worker.inicio_arranque = time.perf_counter()
+
+
+def post_worker_init(worker):
+    # La app ya está cargada: precarga plantillas, URLs, UF y facetas antes de
+    # aceptar la primera petición, y deja en el log cuánto tardó cada etapa.
+    from propiedades.arranque import calentar_worker
+    calentar_worker(worker)
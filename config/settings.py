@@ -34,7 +34,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    # WhiteNoise con soporte async (ver propiedades.estaticos)
+    'propiedades.estaticos.EstaticosMiddleware',
+    'propiedades.media.MediaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -98,11 +100,38 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
+# Variantes WebP/AVIF generadas por `manage.py optimizar_estaticos` (no se versionan).
+# Solo se recolecta la subcarpeta variantes/: el manifiesto variantes.json no se publica
+STATIC_OPTIMIZADO_DIR = BASE_DIR / 'static_optimizado'
+if (STATIC_OPTIMIZADO_DIR / 'variantes').exists():
+    STATICFILES_DIRS.append(STATIC_OPTIMIZADO_DIR / 'variantes')
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Desde Django 5.1 STATICFILES_STORAGE ya no se lee: whitenoise se configura aquí.
+# Con el paquete Brotli instalado genera también las versiones .br además de .gz
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Quién envía los archivos de MEDIA_URL: '' (Django), 'x-accel' (nginx) o 'x-sendfile' (Apache)
+MEDIA_ENVIO = os.getenv('MEDIA_ENVIO', '')
+# Location interna de nginx que apunta a MEDIA_ROOT (solo con 'x-accel')
+MEDIA_ENVIO_PREFIJO = os.getenv('MEDIA_ENVIO_PREFIJO', '/media-interna/')
+
+# Caché en disco compartida entre los workers de gunicorn (facetas del catálogo, valor UF)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_DIR', BASE_DIR / '.cache'),
+    }
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -113,4 +142,7 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 
-SITE_ID = 1
\ No newline at end of file
+SITE_ID = 1
+
+# Token del feed de cambios para portales (?token= o "Authorization: Bearer <token>"). Sin él, el feed responde 403
+FEED_TOKEN = os.getenv('FEED_TOKEN')
\ No newline at end of file
@@ -4,7 +4,7 @@ from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
 
-from propiedades.views import inicio, detalle_propiedad, nosotros, catalogo, servicios, enviar_contacto
+from propiedades.views import inicio, detalle_propiedad, nosotros, catalogo, servicios, enviar_contacto, feed_cambios
 from django.contrib.sitemaps.views import sitemap
 from propiedades.sitemaps import PropiedadSitemap, StaticViewSitemap
 
@@ -16,6 +16,7 @@ def robots_txt(request):
     lines = [
         "User-agent: *",
         "Disallow: /admin/",
+        "Disallow: /feed/",
         "Allow: /",
         "",
         "Sitemap: https://terrastudio.cl/sitemap.xml",
@@ -40,10 +41,13 @@ urlpatterns = [
     path('catalogo/', catalogo, name='catalogo'),
     path('servicios/', servicios, name='servicios'),
 
+    path('feed/cambios.json', feed_cambios, {'formato': 'json'}, name='feed_cambios_json'),
+    path('feed/cambios.xml', feed_cambios, {'formato': 'xml'}, name='feed_cambios_xml'),
+
     path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
     path('robots.txt', robots_txt),
 ]
 
+# MEDIA_URL lo sirve propiedades.media.MediaMiddleware, también en producción
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import Propiedad, ImagenPropiedad
+from .models import Propiedad, ImagenPropiedad, EstadoEnlace
+from django.db.models import Count, Q
 from django.utils.html import format_html
 
+ESTADOS_ENLACE_ROTO = ('ROTO', 'ERROR')
+
 class ImagenPropiedadInline(admin.TabularInline):
     model = ImagenPropiedad
     extra = 1
@@ -10,6 +13,38 @@ class ImagenPropiedadInline(admin.TabularInline):
     def preview(self, obj):
         return format_html('<img src="{}" style="height:80px; border-radius:4px;" />', obj.imagen.url) if obj.imagen else "-"
 
+class EstadoEnlaceInline(admin.TabularInline):
+    model = EstadoEnlace
+    extra = 0
+    max_num = 0
+    can_delete = False
+    fields = ('campo', 'link', 'estado_visual', 'codigo_http', 'detalle', 'revisado')
+    readonly_fields = fields
+    verbose_name_plural = "Estado de los links (manage.py revisar_enlaces)"
+
+    @admin.display(description="URL")
+    def link(self, obj):
+        return format_html('<a href="{}" target="_blank">{}</a>', obj.url, obj.url[:60])
+
+    @admin.display(description="Estado")
+    def estado_visual(self, obj):
+        color = '#dc3545' if obj.estado in ESTADOS_ENLACE_ROTO else '#198754' if obj.estado == 'OK' else '#fd7e14'
+        return format_html('<strong style="color:{};">{}</strong>', color, obj.get_estado_display())
+
+class EnlacesRotosFilter(admin.SimpleListFilter):
+    title = 'links rotos'
+    parameter_name = 'enlaces_rotos'
+
+    def lookups(self, request, model_admin):
+        return (('si', 'Con links rotos'), ('no', 'Sin links rotos'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'si':
+            return queryset.filter(n_enlaces_rotos__gt=0)
+        if self.value() == 'no':
+            return queryset.filter(n_enlaces_rotos=0)
+        return queryset
+
 @admin.register(Propiedad)
 class PropiedadAdmin(admin.ModelAdmin):
 
@@ -19,13 +54,13 @@ class PropiedadAdmin(admin.ModelAdmin):
             'propiedades/js/admin_links.js',
         )
 
-    list_display = ('id_ficha', 'titulo', 'estado', 'precio_visual', 'esta_publicada', 'fecha_ingreso')
-    list_filter = ('esta_publicada', 'estado', 'operacion', 'comuna', 'plataformas_publicadas')
+    list_display = ('id_ficha', 'titulo', 'estado', 'precio_visual', 'esta_publicada', 'enlaces_rotos', 'fecha_ingreso')
+    list_filter = ('esta_publicada', 'estado', 'operacion', 'comuna', 'plataformas_publicadas', EnlacesRotosFilter)
     search_fields = ('titulo', 'id_ficha', 'rol')
     list_editable = ('estado', 'esta_publicada')
     ordering = ('-fecha_ingreso',)
     list_per_page = 30
-    inlines = [ImagenPropiedadInline]
+    inlines = [ImagenPropiedadInline, EstadoEnlaceInline]
     
 
     readonly_fields = ('precio_uf', 'precio_pesos_referencia', 'slug', 'creado', 'actualizado')
@@ -78,9 +113,20 @@ class PropiedadAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            n_enlaces_rotos=Count('estados_enlace', filter=Q(estados_enlace__estado__in=ESTADOS_ENLACE_ROTO))
+        )
+
     @admin.display(description="Precio")
     def precio_visual(self, obj):
         return obj.precio_formateado
+
+    @admin.display(description="Links rotos", ordering='n_enlaces_rotos')
+    def enlaces_rotos(self, obj):
+        if obj.n_enlaces_rotos:
+            return format_html('<strong style="color:#dc3545;">⚠ {}</strong>', obj.n_enlaces_rotos)
+        return "-"
     
 @admin.register(ImagenPropiedad)
 class ImagenPropiedadAdmin(admin.ModelAdmin):
@@ -95,4 +141,16 @@ class ImagenPropiedadAdmin(admin.ModelAdmin):
     def preview_miniatura(self, obj):
         if obj.imagen:
             return format_html('<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 4px;" />', obj.imagen.url)
-        return "-"
\ No newline at end of file
+        return "-"
+
+@admin.register(EstadoEnlace)
+class EstadoEnlaceAdmin(admin.ModelAdmin):
+
+    list_display = ('propiedad', 'campo', 'url', 'estado', 'codigo_http', 'latencia_ms', 'revisado')
+    list_filter = ('estado', 'campo', 'revisado')
+    search_fields = ('propiedad__titulo', 'propiedad__id_ficha', 'url')
+    list_select_related = ('propiedad',)
+    readonly_fields = ('propiedad', 'campo', 'url', 'estado', 'codigo_http', 'detalle', 'latencia_ms', 'revisado')
+
+    def has_add_permission(self, request):
+        return False
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PropiedadesConfig(AppConfig):
     name = 'propiedades'
+
+    def ready(self):
+        # Registra las señales que invalidan la caché de facetas
+        from . import facetas  # noqa: F401
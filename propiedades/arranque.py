@@ -0,0 +1,85 @@
+import logging
+import os
+import time
+
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+from .facetas import obtener_facetas
+from .models import Propiedad
+from .uf import obtener_valor_uf
+
+logger = logging.getLogger(__name__)
+
+
+def resolver_urls():
+    resolver = get_resolver()
+    # Fuerza _populate() de todos los patrones, incluidos los include() del admin
+    resolver.reverse_dict
+    resolver.resolve('/')
+
+
+def compilar_plantillas():
+    """
+    Carga cada plantilla del proyecto. Sin DEBUG, Django usa el loader cacheado
+    por defecto, así que quedan compiladas en memoria para las peticiones.
+    """
+    for motor in engines.all():
+        for directorio in motor.engine.dirs:
+            for raiz, _, archivos in os.walk(directorio):
+                for archivo in archivos:
+                    nombre = os.path.relpath(os.path.join(raiz, archivo), directorio).replace(os.sep, '/')
+                    motor.get_template(nombre)
+
+
+def preparar_campos():
+    for campo in Propiedad._meta.get_fields():
+        getattr(campo, 'flatchoices', None)
+    Propiedad._meta.get_field('plataformas_publicadas').get_choices(include_blank=False)
+
+
+def preparar_facetas():
+    from .views import propiedades_publicas
+    obtener_facetas(propiedades_publicas(), {})
+
+
+# No se precalienta la conexión a la BD: con CONN_MAX_AGE = 0 Django la cierra al
+# iniciar cada petición, y bajo uvicorn el ORM corre en otro hilo (sync_to_async).
+PASOS = (
+    ('urls', resolver_urls),
+    ('plantillas', compilar_plantillas),
+    ('campos', preparar_campos),
+    ('uf', obtener_valor_uf),
+    ('facetas', preparar_facetas),
+)
+
+
+def calentar():
+    """Ejecuta cada paso de warm-up y devuelve {paso: ms}. Un paso que falla no detiene el resto."""
+    tiempos = {}
+    for nombre, funcion in PASOS:
+        inicio = time.perf_counter()
+        try:
+            funcion()
+        except Exception:
+            logger.exception("Falló el paso de warm-up '%s'", nombre)
+        tiempos[nombre] = (time.perf_counter() - inicio) * 1000
+    # Las facetas y la UF pueden abrir una conexión en el hilo principal del worker;
+    # bajo ASGI nadie la cerraría (close_old_connections corre en los hilos de petición)
+    connections.close_all()
+    return tiempos
+
+
+def formatear(tiempos):
+    return ', '.join(f"{nombre} {ms:,.0f} ms" for nombre, ms in tiempos.items())
+
+
+def calentar_worker(worker):
+    """Hook post_worker_init de gunicorn (ver config/gunicorn_*.py)."""
+    carga = (time.perf_counter() - worker.inicio_arranque) * 1000
+    tiempos = calentar()
+    worker.log.info(
+        "Worker %s listo: app cargada en %.0f ms, warm-up %.0f ms (%s)",
+        worker.pid, carga, sum(tiempos.values()), formatear(tiempos),
+    )
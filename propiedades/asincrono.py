@@ -0,0 +1,14 @@
+from asgiref.sync import sync_to_async
+
+
+async def iterar_async(generador, thread_sensitive=True):
+    """
+    Consume un generador síncrono desde código async, un fragmento a la vez.
+    Bajo ASGI Django acumula en memoria los iteradores síncronos antes de
+    enviarlos; uno async mantiene el streaming. Con thread_sensitive=False cada
+    paso corre en un hilo cualquiera en vez del hilo compartido del ORM (útil
+    para leer archivos, que no tocan la BD).
+    """
+    siguiente = sync_to_async(next, thread_sensitive=thread_sensitive)
+    while (parte := await siguiente(generador, None)) is not None:
+        yield parte
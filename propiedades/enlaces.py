@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CAMPOS_ENLACE = (
+    'url_facebook', 'url_meta_ads', 'url_instagram', 'url_portalinmobiliario',
+    'url_yapo', 'url_toctoc', 'url_terrastudio', 'url_otra',
+    'link_google_earth', 'link_drive_fotos',
+)
+# Redes sociales suelen responder 401/403/429 a bots: no significa que el aviso esté caído
+CODIGOS_BLOQUEO = {401, 403, 429}
+# Servidores que no implementan HEAD; se reintenta con GET
+CODIGOS_SIN_HEAD = {405, 501}
+USER_AGENT = 'Mozilla/5.0 (compatible; TerraStudio-RevisorEnlaces/1.0; +https://terrastudio.cl)'
+
+
+def crear_sesion(conexiones):
+    sesion = requests.Session()
+    sesion.headers['User-Agent'] = USER_AGENT
+    # Conexiones keep-alive reutilizadas entre hilos: un pool por host con tantas como hilos
+    adaptador = HTTPAdapter(pool_connections=32, pool_maxsize=conexiones, max_retries=0)
+    sesion.mount('http://', adaptador)
+    sesion.mount('https://', adaptador)
+    return sesion
+
+
+def intercalar_por_host(urls):
+    """Ordena las URLs alternando hosts, así los hilos no esperan todos al mismo semáforo."""
+    por_host = defaultdict(list)
+    for url in urls:
+        por_host[urlsplit(url).netloc.lower()].append(url)
+    return [url for grupo in zip_longest(*por_host.values()) for url in grupo if url]
+
+
+class RevisorEnlaces:
+    """
+    Revisa URLs en paralelo con un pool de hilos, limitando las peticiones
+    simultáneas por host. `sesion` se puede inyectar (p. ej. para apuntar a un
+    servidor HTTP local en pruebas).
+    """
+
+    def __init__(self, hilos=16, por_host=2, timeout=10, sesion=None):
+        self.hilos = hilos
+        self.por_host = por_host
+        self.timeout = timeout
+        self.sesion = sesion or crear_sesion(hilos)
+        self._semaforos = {}
+        self._lock = threading.Lock()
+
+    def _semaforo(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.por_host)
+            return self._semaforos[host]
+
+    def _pedir(self, metodo, url):
+        respuesta = self.sesion.request(metodo, url, timeout=self.timeout, allow_redirects=True, stream=True)
+        respuesta.close()
+        return respuesta.status_code
+
+    def revisar_url(self, url):
+        try:
+            with self._semaforo(url):
+                # Se mide dentro del semáforo: la espera por otras peticiones al mismo host no es latencia
+                inicio = time.monotonic()
+                codigo = self._pedir('HEAD', url)
+                if codigo in CODIGOS_SIN_HEAD:
+                    codigo = self._pedir('GET', url)
+                latencia_ms = int((time.monotonic() - inicio) * 1000)
+        except requests.Timeout:
+            return {'estado': 'ERROR', 'codigo_http': None, 'detalle': f"Sin respuesta en {self.timeout}s", 'latencia_ms': None}
+        except requests.RequestException as e:
+            return {'estado': 'ERROR', 'codigo_http': None, 'detalle': type(e).__name__, 'latencia_ms': None}
+
+        if codigo < 400:
+            estado = 'OK'
+        elif codigo in CODIGOS_BLOQUEO:
+            estado = 'BLOQUEADO'
+        else:
+            estado = 'ROTO'
+        return {
+            'estado': estado,
+            'codigo_http': codigo,
+            'detalle': '',
+            'latencia_ms': latencia_ms,
+        }
+
+    def revisar(self, urls):
+        """Devuelve {url: resultado}; cada URL distinta se consulta una sola vez."""
+        unicas = intercalar_por_host(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.hilos) as pool:
+            return dict(zip(unicas, pool.map(self.revisar_url, unicas)))
@@ -0,0 +1,82 @@
+import json
+import os
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .asincrono import iterar_async
+
+# Anchos (px) que se generan para srcset; nunca se agranda una imagen
+ANCHOS = (480, 960, 1600, 2400)
+# Orden de preferencia en <picture>: el navegador usa el primer formato que soporte
+FORMATOS = {
+    'avif': {'quality': 55, 'speed': 8},
+    'webp': {'quality': 80, 'method': 5},
+}
+EXTENSIONES_ORIGEN = ('.jpg', '.jpeg', '.png', '.webp')
+# Cambiar esta versión obliga a regenerar todo (p. ej. al ajustar calidades o anchos)
+VERSION_PIPELINE = 2
+
+
+def carpeta_optimizada():
+    return os.path.join(settings.STATIC_OPTIMIZADO_DIR, 'variantes')
+
+
+def ruta_manifiesto():
+    return os.path.join(settings.STATIC_OPTIMIZADO_DIR, 'variantes.json')
+
+
+def nombre_variante(ruta, ancho, formato):
+    raiz, _ = os.path.splitext(ruta)
+    return f"{raiz}.{ancho}w.{formato}"
+
+
+@lru_cache(maxsize=4)
+def _leer_manifiesto(ruta, mtime):
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def cargar_variantes():
+    """Manifiesto generado por `optimizar_estaticos`; vacío si aún no se ha corrido."""
+    ruta = ruta_manifiesto()
+    try:
+        mtime = os.path.getmtime(ruta)
+    except OSError:
+        return {}
+    return _leer_manifiesto(ruta, mtime).get('imagenes', {})
+
+
+class EstaticosMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise solo es síncrono: en el stack async (vistas públicas bajo
+    uvicorn) Django tenía que pasar cada petición por un hilo y volver a entrar
+    a la vista con async_to_sync. En modo async solo los archivos estáticos se
+    resuelven en un hilo y se envían en streaming; el resto sigue async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            archivo = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            archivo = self.files.get(request.path_info)
+        if archivo is None:
+            return await self.get_response(request)
+        respuesta = await sync_to_async(self.serve, thread_sensitive=False)(archivo, request)
+        respuesta.streaming_content = iterar_async(iter(respuesta.streaming_content), thread_sensitive=False)
+        return respuesta
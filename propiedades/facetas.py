@@ -0,0 +1,155 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Propiedad, TIPO_OPERACION, TIPO_PROPIEDAD
+
+CLAVE_GENERACION = 'facetas:generacion'
+DURACION_CACHE = 60 * 60 * 24
+
+RANGOS_PRECIO_UF = [
+    ('hasta-500', 'Hasta 500 UF', None, 500),
+    ('500-1000', '500 – 1.000 UF', 500, 1000),
+    ('1000-2000', '1.000 – 2.000 UF', 1000, 2000),
+    ('2000-4000', '2.000 – 4.000 UF', 2000, 4000),
+    ('mas-4000', 'Más de 4.000 UF', 4000, None),
+]
+RANGOS_SUPERFICIE = [
+    ('hasta-5000', 'Hasta 5.000 m²', None, 5000),
+    ('5000-10000', '5.000 – 10.000 m²', 5000, 10000),
+    ('1-5ha', '1 – 5 ha', 10000, 50000),
+    ('mas-5ha', 'Más de 5 ha', 50000, None),
+]
+SERVICIOS = [
+    ('agua', 'Agua', 'factibilidad_agua'),
+    ('luz', 'Luz', 'factibilidad_luz'),
+    ('alcantarillado', 'Alcantarillado', 'factibilidad_alcantarillado'),
+]
+
+
+def _rango(campo, minimo, maximo):
+    q = Q()
+    if minimo is not None:
+        q &= Q(**{f'{campo}__gte': minimo})
+    if maximo is not None:
+        q &= Q(**{f'{campo}__lt': maximo})
+    return q
+
+
+# Facetas de opciones fijas: (valor, etiqueta, condición). Se cuentan todas en una
+# sola query con agregados condicionales (COUNT ... FILTER / CASE WHEN).
+FACETAS = {
+    'tipo': [(valor, etiqueta, Q(tipo=valor)) for valor, etiqueta in TIPO_PROPIEDAD],
+    'operacion': [(valor, etiqueta, Q(operacion=valor)) for valor, etiqueta in TIPO_OPERACION],
+    'precio': [(c, etiqueta, _rango('precio_uf', mi, ma)) for c, etiqueta, mi, ma in RANGOS_PRECIO_UF],
+    'superficie': [(c, etiqueta, _rango('superficie_total_m2', mi, ma)) for c, etiqueta, mi, ma in RANGOS_SUPERFICIE],
+    'servicios': [(c, etiqueta, ~Q(**{campo: 'NO_TIENE'})) for c, etiqueta, campo in SERVICIOS],
+}
+# Facetas de selección única: sus conteos ignoran su propio filtro para que el
+# usuario vea cuántas habría al cambiar de opción. Servicios se suman (AND).
+EXCLUYENTES = ('sector', 'tipo', 'operacion', 'precio', 'superficie')
+
+
+def leer_filtros(parametros):
+    """Normaliza los filtros de la URL, descartando valores desconocidos."""
+    filtros = {}
+    if parametros.get('sector'):
+        filtros['sector'] = parametros['sector']
+    for nombre in ('tipo', 'operacion', 'precio', 'superficie'):
+        valor = parametros.get(nombre)
+        if valor in {v for v, _, _ in FACETAS[nombre]}:
+            filtros[nombre] = valor
+    servicios = sorted(set(parametros.getlist('servicios')) & {v for v, _, _ in FACETAS['servicios']})
+    if servicios:
+        filtros['servicios'] = servicios
+    return filtros
+
+
+def aplicar_filtros(qs, filtros, excepto=None):
+    for nombre, valor in filtros.items():
+        if nombre == excepto:
+            continue
+        if nombre == 'sector':
+            qs = qs.filter(sector=valor)
+        elif nombre == 'servicios':
+            condiciones = dict((v, q) for v, _, q in FACETAS['servicios'])
+            for servicio in valor:
+                qs = qs.filter(condiciones[servicio])
+        else:
+            qs = qs.filter(next(q for v, _, q in FACETAS[nombre] if v == valor))
+    return qs
+
+
+def _contar(qs, nombres):
+    agregados = {}
+    for nombre in nombres:
+        for i, (_, _, q) in enumerate(FACETAS[nombre]):
+            agregados[f'{nombre}_{i}'] = Count('pk', filter=q)
+    fila = qs.aggregate(**agregados) if agregados else {}
+    return {
+        nombre: [
+            {'valor': valor, 'etiqueta': etiqueta, 'n': fila[f'{nombre}_{i}']}
+            for i, (valor, etiqueta, _) in enumerate(FACETAS[nombre])
+        ]
+        for nombre in nombres
+    }
+
+
+def calcular_facetas(qs_base, filtros):
+    activos = [nombre for nombre in EXCLUYENTES if nombre in filtros and nombre != 'sector']
+    comunes = [nombre for nombre in FACETAS if nombre not in activos]
+
+    facetas = _contar(aplicar_filtros(qs_base, filtros), comunes)
+    for nombre in activos:
+        facetas.update(_contar(aplicar_filtros(qs_base, filtros, excepto=nombre), [nombre]))
+
+    sectores = (
+        aplicar_filtros(qs_base, filtros, excepto='sector')
+        .exclude(sector='').values_list('sector').annotate(n=Count('pk')).order_by('sector')
+    )
+    facetas['sector'] = [{'valor': s, 'etiqueta': s, 'n': n} for s, n in sectores]
+    if 'sector' in filtros and filtros['sector'] not in {s['valor'] for s in facetas['sector']}:
+        facetas['sector'].append({'valor': filtros['sector'], 'etiqueta': filtros['sector'], 'n': 0})
+    return facetas
+
+
+def obtener_facetas(qs_base, filtros, nombre='catalogo'):
+    """
+    Conteos por faceta para el conjunto de filtros actual, desde caché. La
+    clave incluye una generación que se incrementa cada vez que cambia una
+    propiedad, así no hace falta buscar y borrar claves viejas.
+    """
+    generacion = cache.get_or_set(CLAVE_GENERACION, 1, None)
+    if 'sector' in filtros:
+        sectores = cache.get_or_set(
+            f'facetas:{nombre}:{generacion}:sectores',
+            lambda: set(qs_base.prefetch_related(None).exclude(sector='').order_by().values_list('sector', flat=True).distinct()),
+            DURACION_CACHE,
+        )
+        # El sector llega libre en la URL: valores inventados no deben desplazar de la caché a los reales
+        if filtros['sector'] not in sectores:
+            return calcular_facetas(qs_base, filtros)
+    firma = hashlib.md5(json.dumps(filtros, sort_keys=True).encode()).hexdigest()
+    clave = f'facetas:{nombre}:{generacion}:{firma}'
+    facetas = cache.get(clave)
+    if facetas is None:
+        facetas = calcular_facetas(qs_base, filtros)
+        cache.set(clave, facetas, DURACION_CACHE)
+    return facetas
+
+
+def invalidar_facetas():
+    try:
+        cache.incr(CLAVE_GENERACION)
+    except ValueError:
+        cache.set(CLAVE_GENERACION, 2, None)
+
+
+@receiver(post_save, sender=Propiedad)
+@receiver(post_delete, sender=Propiedad)
+def invalidar_por_cambio(sender, **kwargs):
+    invalidar_facetas()
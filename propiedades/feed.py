@@ -0,0 +1,139 @@
+import json
+import re
+from io import StringIO
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .models import CambioPublicacion, ImagenPropiedad, Propiedad
+
+# Cambios leídos por query: el feed recorre el log por keyset (id > cursor) en
+# lotes, así la memoria usada no depende del tamaño del catálogo
+TAMANO_LOTE = 200
+
+CAMPOS_PUBLICOS = (
+    'id_ficha', 'slug', 'titulo', 'estado', 'tipo', 'operacion', 'moneda',
+    'precio_lista', 'precio_uf', 'precio_pesos_referencia',
+    'superficie_total_m2', 'superficie_construida_m2',
+    'comuna', 'sector', 'referencia_locacion', 'coordenadas_gps', 'link_google_earth',
+    'topografia', 'factibilidad_agua', 'factibilidad_luz', 'factibilidad_alcantarillado',
+    'dormitorios', 'banos', 'estacionamientos', 'descripcion', 'esta_publicada',
+    'url_facebook', 'url_meta_ads', 'url_instagram', 'url_portalinmobiliario',
+    'url_yapo', 'url_toctoc', 'url_terrastudio', 'url_otra', 'actualizado',
+)
+# Caracteres de control que XML 1.0 no admite (p. ej. \x0b al pegar desde Word):
+# SimplerXMLGenerator los rechaza y cortaría el feed a mitad del streaming
+CARACTERES_INVALIDOS_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def serializar_imagen(img, request):
+    return {
+        'id': img.pk,
+        'url': request.build_absolute_uri(img.imagen.url),
+        'alt': img.alt_text,
+        'es_principal': img.es_principal,
+        'orden': img.orden,
+        'ancho': img.ancho,
+        'alto': img.alto,
+    }
+
+
+def serializar_propiedad(prop, request):
+    datos = {campo: getattr(prop, campo) for campo in CAMPOS_PUBLICOS}
+    datos['id'] = prop.pk
+    datos['url'] = request.build_absolute_uri(prop.get_absolute_url())
+    datos['plataformas_publicadas'] = list(prop.plataformas_publicadas)
+    datos['imagenes'] = [serializar_imagen(img, request) for img in prop.imagenes.all()]
+    return datos
+
+
+def recorrer_cambios(desde, limite, request):
+    """Genera (cambio, datos_actuales) en orden de id, a partir del cursor `desde`."""
+    ultimo = desde
+    restantes = limite
+    while restantes > 0:
+        lote = list(CambioPublicacion.objects.filter(pk__gt=ultimo).order_by('pk')[:min(TAMANO_LOTE, restantes)])
+        if not lote:
+            return
+
+        ids_prop = {c.objeto_id for c in lote if c.modelo == 'PROPIEDAD' and c.accion != 'ELIMINADO'}
+        ids_img = {c.objeto_id for c in lote if c.modelo == 'IMAGEN' and c.accion != 'ELIMINADO'}
+        propiedades = Propiedad.objects.prefetch_related('imagenes').in_bulk(ids_prop)
+        imagenes = ImagenPropiedad.objects.in_bulk(ids_img)
+
+        for cambio in lote:
+            if cambio.modelo == 'PROPIEDAD':
+                obj = propiedades.get(cambio.objeto_id)
+                datos = serializar_propiedad(obj, request) if obj else None
+            else:
+                obj = imagenes.get(cambio.objeto_id)
+                datos = serializar_imagen(obj, request) if obj else None
+            yield cambio, datos
+
+        ultimo = lote[-1].pk
+        restantes -= len(lote)
+
+
+def _cabecera(cambio, datos):
+    return {
+        'id': cambio.pk,
+        'fecha': cambio.fecha,
+        'modelo': cambio.modelo,
+        # Si el objeto se borró después de este cambio, se informa como eliminado
+        'accion': cambio.accion if datos is not None else 'ELIMINADO',
+        'objeto_id': cambio.objeto_id,
+        'propiedad_id': cambio.propiedad_id,
+        'id_ficha': cambio.id_ficha,
+    }
+
+
+def _hay_mas(ultimo):
+    return CambioPublicacion.objects.filter(pk__gt=ultimo).exists()
+
+
+def generar_json(desde, limite, request):
+    yield '{"cambios": ['
+    ultimo = desde
+    for i, (cambio, datos) in enumerate(recorrer_cambios(desde, limite, request)):
+        entrada = _cabecera(cambio, datos)
+        entrada['datos'] = datos
+        yield (',' if i else '') + '\n' + json.dumps(entrada, cls=DjangoJSONEncoder, ensure_ascii=False)
+        ultimo = cambio.pk
+    yield '\n], "siguiente": %d, "hay_mas": %s}\n' % (ultimo, 'true' if _hay_mas(ultimo) else 'false')
+
+
+def _escribir_xml(xml, nombre, valor):
+    if isinstance(valor, dict):
+        xml.startElement(nombre, {})
+        for clave, sub in valor.items():
+            _escribir_xml(xml, clave, sub)
+        xml.endElement(nombre)
+    elif isinstance(valor, list):
+        xml.startElement(nombre, {})
+        for sub in valor:
+            _escribir_xml(xml, 'item', sub)
+        xml.endElement(nombre)
+    elif valor is None:
+        xml.addQuickElement(nombre, attrs={'nulo': 'true'})
+    elif isinstance(valor, bool):
+        xml.addQuickElement(nombre, 'true' if valor else 'false')
+    else:
+        texto = valor.isoformat() if hasattr(valor, 'isoformat') else str(valor)
+        xml.addQuickElement(nombre, CARACTERES_INVALIDOS_XML.sub('', texto))
+
+
+def generar_xml(desde, limite, request):
+    yield '<?xml version="1.0" encoding="utf-8"?>\n<cambios desde="%d">\n' % desde
+    ultimo = desde
+    for cambio, datos in recorrer_cambios(desde, limite, request):
+        buffer = StringIO()
+        xml = SimplerXMLGenerator(buffer, 'utf-8', short_empty_elements=True)
+        cabecera = {k: CARACTERES_INVALIDOS_XML.sub('', str(v)) for k, v in _cabecera(cambio, datos).items() if k != 'fecha'}
+        cabecera['fecha'] = cambio.fecha.isoformat()
+        xml.startElement('cambio', cabecera)
+        if datos is not None:
+            _escribir_xml(xml, 'datos', datos)
+        xml.endElement('cambio')
+        yield buffer.getvalue() + '\n'
+        ultimo = cambio.pk
+    yield '<siguiente hay_mas="%s">%d</siguiente>\n</cambios>\n' % ('true' if _hay_mas(ultimo) else 'false', ultimo)
@@ -0,0 +1,43 @@
+import base64
+import io
+
+from PIL import Image, ImageOps
+
+TAMANO_PLACEHOLDER = 20
+# Orientaciones EXIF que giran la foto 90°: el navegador la muestra con ancho y alto invertidos
+ORIENTACIONES_ROTADAS = {5, 6, 7, 8}
+
+
+def analizar_imagen(archivo):
+    """
+    Calcula una sola vez (al subir la foto) lo que necesitan las plantillas para
+    cargar la galería de forma progresiva: dimensiones reales, color dominante y
+    un placeholder WebP de ~20px como data URI.
+    """
+    archivo.seek(0)
+    with Image.open(archivo) as img:
+        ancho, alto = img.size
+        if img.getexif().get(0x0112) in ORIENTACIONES_ROTADAS:
+            ancho, alto = alto, ancho
+
+        # En JPEG, draft() decodifica a escala reducida: evita abrir la foto completa del dron
+        img.draft('RGB', (TAMANO_PLACEHOLDER * 8, TAMANO_PLACEHOLDER * 8))
+        img = ImageOps.exif_transpose(img).convert('RGB')
+
+        muestra = img.copy()
+        muestra.thumbnail((64, 64))
+        paleta = muestra.quantize(colors=5)
+        _, indice = max(paleta.getcolors())
+        r, g, b = paleta.getpalette()[indice * 3:indice * 3 + 3]
+
+        img.thumbnail((TAMANO_PLACEHOLDER, TAMANO_PLACEHOLDER))
+        buffer = io.BytesIO()
+        img.save(buffer, 'WEBP', quality=40)
+    archivo.seek(0)
+
+    return {
+        'ancho': ancho,
+        'alto': alto,
+        'color_dominante': f"#{r:02x}{g:02x}{b:02x}",
+        'placeholder': "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
@@ -1,5 +1,7 @@
 from django.core.management.base import BaseCommand
-from propiedades.models import Propiedad
+from propiedades.models import Propiedad, CambioPublicacion
+from propiedades.facetas import invalidar_facetas
+from propiedades.uf import consultar_valor_uf
 import requests
 from decimal import Decimal
 from django.utils import timezone
@@ -11,20 +13,18 @@ class Command(BaseCommand):
         self.stdout.write("Consultando valor UF actual...")
         
         try:
-            response = requests.get('https://mindicador.cl/api/uf', timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                valor_uf_hoy = Decimal(str(data['serie'][0]['valor']))
-                self.stdout.write(self.style.SUCCESS(f"Valor UF: ${valor_uf_hoy:,.2f}"))
-            else:
-                self.stdout.write(self.style.ERROR("Error HTTP en la API."))
-                return
+            valor_uf_hoy = consultar_valor_uf(timeout=10)
+            self.stdout.write(self.style.SUCCESS(f"Valor UF: ${valor_uf_hoy:,.2f}"))
+        except requests.HTTPError:
+            self.stdout.write(self.style.ERROR("Error HTTP en la API."))
+            return
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error de conexión: {e}"))
             return
 
         propiedades = Propiedad.objects.all()
         contador = 0
+        cambios = []
 
         for prop in propiedades:
             if prop.moneda == 'CLP':
@@ -45,4 +45,13 @@ class Command(BaseCommand):
             )
             contador += 1
 
+            # update() no dispara señales: se registra el cambio para el feed de portales
+            if nuevo_pesos != prop.precio_pesos_referencia or nueva_uf != prop.precio_uf:
+                cambios.append(CambioPublicacion(
+                    modelo='PROPIEDAD', accion='ACTUALIZADO',
+                    objeto_id=prop.pk, propiedad_id=prop.pk, id_ficha=prop.id_ficha,
+                ))
+
+        CambioPublicacion.objects.bulk_create(cambios)
+        invalidar_facetas()
         self.stdout.write(self.style.SUCCESS(f"Operación completada. {contador} propiedades recalculadas desde su precio_lista original."))
\ No newline at end of file
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from propiedades.models import ImagenPropiedad
+
+
+class Command(BaseCommand):
+    help = 'Calcula placeholder, color dominante y dimensiones de las fotos subidas antes de la carga progresiva'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Recalcula también las imágenes que ya tienen placeholder.')
+
+    def handle(self, *args, **options):
+        imagenes = ImagenPropiedad.objects.exclude(imagen='')
+        if not options['todas']:
+            imagenes = imagenes.filter(placeholder='')
+
+        contador = 0
+        fallidas = 0
+        for img in imagenes.only('pk', 'imagen').iterator():
+            try:
+                img.imagen.open('rb')
+                ok = img.calcular_placeholder()
+            except FileNotFoundError:
+                ok = False
+            finally:
+                img.imagen.close()
+
+            if not ok:
+                fallidas += 1
+                self.stdout.write(self.style.WARNING(f"No se pudo procesar {img.imagen.name}"))
+                continue
+
+            # update() directo: no vuelve a disparar las señales de referencias ni actualiza fechas
+            ImagenPropiedad.objects.filter(pk=img.pk).update(
+                ancho=img.ancho, alto=img.alto,
+                color_dominante=img.color_dominante, placeholder=img.placeholder,
+            )
+            contador += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Operación completada. {contador} imágenes procesadas, {fallidas} con error."))
@@ -0,0 +1,123 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db.models import Count
+from propiedades.models import BlobMedia, ImagenPropiedad
+from propiedades.storage import CARPETAS_GESTIONADAS, nombre_original
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = 'Elimina de MEDIA_ROOT los archivos y rendiciones que ya no usa ninguna imagen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa, no borra nada.')
+        parser.add_argument('--gracia', type=float, default=24,
+                            help='Horas mínimas de antigüedad para borrar un archivo (protege subidas en curso).')
+        parser.add_argument('--lote', type=int, default=500, help='Archivos consultados a la BD por cada query.')
+        parser.add_argument('--recalcular', action='store_true',
+                            help='Reconstruye el conteo de referencias de BlobMedia antes de limpiar.')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.limite = time.time() - options['gracia'] * 3600
+        self.raiz = str(settings.MEDIA_ROOT)
+        self.borrados = 0
+        self.liberado = 0
+
+        if options['recalcular']:
+            self.recalcular_referencias()
+
+        if not os.path.isdir(self.raiz):
+            self.stdout.write(self.style.WARNING(f"No existe MEDIA_ROOT ({self.raiz})."))
+            return
+
+        lote = []
+        revisados = 0
+        carpetas = [os.path.join(self.raiz, c) for c in CARPETAS_GESTIONADAS]
+        for ruta, nombre in self.recorrer([c for c in carpetas if os.path.isdir(c)]):
+            lote.append((ruta, nombre))
+            revisados += 1
+            if len(lote) >= options['lote']:
+                self.procesar_lote(lote)
+                lote = []
+        if lote:
+            self.procesar_lote(lote)
+
+        if not self.dry_run:
+            # Registros de blobs sin referencias cuyo archivo ya no existe
+            for blob in BlobMedia.objects.filter(referencias__lte=0).only('archivo').iterator():
+                if not os.path.exists(os.path.join(self.raiz, blob.archivo)):
+                    blob.delete()
+
+        accion = "Se borrarían" if self.dry_run else "Borrados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{revisados} archivos revisados. {accion} {self.borrados} huérfanos ({self.liberado / 1_048_576:,.1f} MB)."
+        ))
+
+    def recorrer(self, carpetas):
+        # Recorrido en streaming con scandir: nunca se carga el árbol completo en memoria
+        pendientes = list(carpetas)
+        while pendientes:
+            actual = pendientes.pop()
+            with os.scandir(actual) as entradas:
+                for entrada in entradas:
+                    if entrada.name.startswith('.'):
+                        continue
+                    if entrada.is_dir(follow_symlinks=False):
+                        pendientes.append(entrada.path)
+                    elif entrada.is_file(follow_symlinks=False):
+                        nombre = os.path.relpath(entrada.path, self.raiz).replace(os.sep, '/')
+                        yield entrada.path, nombre
+
+    def procesar_lote(self, lote):
+        originales = {nombre_original(nombre) for _, nombre in lote}
+        en_uso = set(ImagenPropiedad.objects.filter(imagen__in=originales).values_list('imagen', flat=True))
+        en_uso.update(BlobMedia.objects.filter(archivo__in=originales, referencias__gt=0).values_list('archivo', flat=True))
+
+        for ruta, nombre in lote:
+            if nombre_original(nombre) in en_uso:
+                continue
+            try:
+                info = os.stat(ruta)
+            except FileNotFoundError:
+                continue
+            if info.st_mtime > self.limite:
+                continue
+            self.borrar(ruta, nombre, info.st_size)
+
+    def borrar(self, ruta, nombre, tamano):
+        original = nombre_original(nombre)
+        if not self.dry_run:
+            # Última comprobación justo antes de borrar, por si el blob se reutilizó durante el recorrido
+            if ImagenPropiedad.objects.filter(imagen=original).exists() or \
+                    BlobMedia.objects.filter(archivo=original, referencias__gt=0).exists():
+                return
+            try:
+                # Una subida que reutiliza el blob le renueva la fecha (os.utime) antes
+                # de que exista su ImagenPropiedad: se vuelve a leer justo antes de borrar
+                if os.stat(ruta).st_mtime > self.limite:
+                    return
+                os.remove(ruta)
+            except FileNotFoundError:
+                return
+            if original == nombre:
+                BlobMedia.objects.filter(archivo=nombre, referencias__lte=0).delete()
+
+        self.borrados += 1
+        self.liberado += tamano
+        self.stdout.write(f"  {'[dry-run] ' if self.dry_run else 'Eliminado '}{nombre}")
+
+    def recalcular_referencias(self):
+        conteos = dict(
+            ImagenPropiedad.objects.filter(imagen__startswith='blobs/')
+            .values_list('imagen').order_by().annotate(n=Count('id')).values_list('imagen', 'n')
+        )
+        for nombre, n in conteos.items():
+            BlobMedia.objects.update_or_create(
+                archivo=nombre,
+                defaults={'referencias': n},
+                create_defaults={'referencias': n, 'hash': os.path.splitext(os.path.basename(nombre))[0]},
+            )
+        BlobMedia.objects.exclude(archivo__in=list(conteos)).update(referencias=0)
+        self.stdout.write(self.style.SUCCESS(f"Referencias recalculadas para {len(conteos)} blobs."))
@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from PIL import Image, ImageOps
+from propiedades.estaticos import (
+    ANCHOS, EXTENSIONES_ORIGEN, FORMATOS, VERSION_PIPELINE,
+    carpeta_optimizada, nombre_variante, ruta_manifiesto,
+)
+import hashlib
+import json
+import os
+
+
+def hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Genera variantes WebP/AVIF redimensionadas de static/img para <picture>/srcset (correr antes de collectstatic)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forzar', action='store_true', help='Regenera todo aunque el contenido no haya cambiado.')
+        parser.add_argument('--hilos', type=int, default=os.cpu_count() or 2)
+
+    def handle(self, *args, **options):
+        destino = str(carpeta_optimizada())
+        os.makedirs(destino, exist_ok=True)
+
+        anterior = {}
+        if os.path.exists(ruta_manifiesto()) and not options['forzar']:
+            with open(ruta_manifiesto(), encoding='utf-8') as f:
+                datos = json.load(f)
+            if datos.get('version') == VERSION_PIPELINE:
+                anterior = datos.get('imagenes', {})
+
+        origenes = dict(self.buscar_imagenes(destino))
+        pendientes = []
+        imagenes = {}
+        for ruta, absoluta in origenes.items():
+            digest = hash_archivo(absoluta)
+            previa = anterior.get(ruta)
+            if previa and previa['hash'] == digest and self.variantes_existen(destino, previa):
+                imagenes[ruta] = previa
+            else:
+                pendientes.append((ruta, absoluta, digest))
+
+        with ThreadPoolExecutor(max_workers=options['hilos']) as pool:
+            for ruta, resultado in pool.map(lambda p: (p[0], self.procesar(destino, *p)), pendientes):
+                imagenes[ruta] = resultado
+                self.stdout.write(f"  {ruta}: {resultado['ancho']}x{resultado['alto']}")
+
+        # Variantes que ya no corresponden (imagen borrada de static/ o con otros anchos)
+        for ruta, previa in anterior.items():
+            vigentes = set(self.nombres(imagenes[ruta])) if ruta in imagenes else set()
+            for nombre in self.nombres(previa):
+                if nombre not in vigentes:
+                    try:
+                        os.remove(os.path.join(destino, nombre))
+                    except FileNotFoundError:
+                        pass
+
+        with open(ruta_manifiesto(), 'w', encoding='utf-8') as f:
+            json.dump({'version': VERSION_PIPELINE, 'imagenes': imagenes}, f, indent=1, sort_keys=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Operación completada. {len(pendientes)} imágenes procesadas, {len(origenes) - len(pendientes)} sin cambios."
+        ))
+
+    def buscar_imagenes(self, destino):
+        for carpeta in settings.STATICFILES_DIRS:
+            carpeta = str(carpeta[1] if isinstance(carpeta, (list, tuple)) else carpeta)
+            if os.path.abspath(carpeta) == os.path.abspath(destino):
+                continue
+            for raiz, _, archivos in os.walk(carpeta):
+                for archivo in archivos:
+                    if archivo.lower().endswith(EXTENSIONES_ORIGEN):
+                        absoluta = os.path.join(raiz, archivo)
+                        yield os.path.relpath(absoluta, carpeta).replace(os.sep, '/'), absoluta
+
+    def nombres(self, info):
+        return [nombre for variantes in info['variantes'].values() for _, nombre in variantes]
+
+    def variantes_existen(self, destino, info):
+        return all(os.path.exists(os.path.join(destino, nombre)) for nombre in self.nombres(info))
+
+    def procesar(self, destino, ruta, absoluta, digest):
+        with Image.open(absoluta) as original:
+            img = ImageOps.exif_transpose(original)
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        ancho, alto = img.size
+
+        anchos = sorted({*(a for a in ANCHOS if a < ancho), min(ancho, ANCHOS[-1])})
+        variantes = {formato: [] for formato in FORMATOS}
+        for objetivo in anchos:
+            copia = img if objetivo == ancho else img.resize(
+                (objetivo, round(alto * objetivo / ancho)), Image.Resampling.LANCZOS
+            )
+            for formato, opciones in FORMATOS.items():
+                nombre = nombre_variante(ruta, objetivo, formato)
+                salida = os.path.join(destino, nombre)
+                os.makedirs(os.path.dirname(salida), exist_ok=True)
+                copia.save(salida, formato.upper(), **opciones)
+                variantes[formato].append([objetivo, nombre])
+
+        return {'hash': digest, 'ancho': ancho, 'alto': alto, 'variantes': variantes}
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+import requests
+import statistics
+import threading
+import time
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga simple: N peticiones con C clientes concurrentes contra una URL (comparar WSGI vs ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Ej: http://127.0.0.1:8000/catalogo/')
+        parser.add_argument('--peticiones', type=int, default=500)
+        parser.add_argument('--concurrencia', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        url = options['url']
+        timeout = options['timeout']
+        locales = threading.local()
+
+        def pedir(_):
+            # Una sesión keep-alive por cliente simulado, como un navegador
+            if not hasattr(locales, 'sesion'):
+                locales.sesion = requests.Session()
+            inicio = time.perf_counter()
+            try:
+                ok = locales.sesion.get(url, timeout=timeout).status_code < 500
+            except requests.RequestException:
+                ok = False
+            return ok, time.perf_counter() - inicio
+
+        self.stdout.write(f"{options['peticiones']} peticiones a {url} con {options['concurrencia']} clientes...")
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            resultados = list(pool.map(pedir, range(options['peticiones'])))
+        total = time.perf_counter() - inicio
+
+        latencias = sorted(t * 1000 for _, t in resultados)
+        errores = sum(1 for ok, _ in resultados if not ok)
+        percentil = lambda p: latencias[min(len(latencias) - 1, int(len(latencias) * p))]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Throughput: {len(resultados) / total:,.1f} req/s en {total:,.2f}s · errores: {errores}\n"
+            f"Latencia ms  p50: {statistics.median(latencias):,.0f}  p95: {percentil(0.95):,.0f}  "
+            f"p99: {percentil(0.99):,.0f}  máx: {latencias[-1]:,.0f}"
+        ))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from propiedades.enlaces import CAMPOS_ENLACE, RevisorEnlaces
+from propiedades.models import EstadoEnlace, Propiedad
+from collections import Counter
+
+
+class Command(BaseCommand):
+    help = 'Revisa en paralelo los links a portales, Google Earth y Drive de cada propiedad y guarda su estado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=16, help='Peticiones simultáneas en total.')
+        parser.add_argument('--por-host', type=int, default=2, help='Peticiones simultáneas por dominio.')
+        parser.add_argument('--timeout', type=float, default=10, help='Segundos máximos por petición.')
+
+    def handle(self, *args, **options):
+        enlaces = []
+        for fila in Propiedad.objects.values('pk', *CAMPOS_ENLACE).iterator():
+            for campo in CAMPOS_ENLACE:
+                if fila[campo]:
+                    enlaces.append((fila['pk'], campo, fila[campo]))
+
+        self.stdout.write(f"Revisando {len(enlaces)} enlaces...")
+        revisor = RevisorEnlaces(hilos=options['hilos'], por_host=options['por_host'], timeout=options['timeout'])
+        resultados = revisor.revisar(url for _, _, url in enlaces)
+
+        ahora = timezone.now()
+        resumen = Counter()
+        for propiedad_id, campo, url in enlaces:
+            resultado = resultados[url]
+            EstadoEnlace.objects.update_or_create(
+                propiedad_id=propiedad_id, campo=campo,
+                defaults={'url': url, 'revisado': ahora, **resultado},
+            )
+            resumen[resultado['estado']] += 1
+            if resultado['estado'] in ('ROTO', 'ERROR'):
+                self.stdout.write(self.style.WARNING(
+                    f"  [{resultado['estado']}] propiedad {propiedad_id} · {campo}: {url} {resultado['codigo_http'] or resultado['detalle']}"
+                ))
+
+        # Links que se borraron de la ficha desde la última revisión
+        vigentes = {(propiedad_id, campo) for propiedad_id, campo, _ in enlaces}
+        obsoletos = [
+            pk for pk, propiedad_id, campo in EstadoEnlace.objects.values_list('pk', 'propiedad_id', 'campo')
+            if (propiedad_id, campo) not in vigentes
+        ]
+        EstadoEnlace.objects.filter(pk__in=obsoletos).delete()
+
+        detalle = ", ".join(f"{estado}: {n}" for estado, n in sorted(resumen.items()))
+        self.stdout.write(self.style.SUCCESS(f"Operación completada. {detalle or 'sin enlaces'}."))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from propiedades.arranque import calentar
+import subprocess
+import sys
+
+# Se corre en un intérprete nuevo para medir el arranque en frío, sin nada importado
+MEDIR_ARRANQUE = """
+import os, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+t0 = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+t1 = time.perf_counter()
+django.setup()
+t2 = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+t3 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000, (t3 - t2) * 1000)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Precarga plantillas, URLs, valor UF y facetas; mide el tiempo de arranque de la app'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--umbral-ms', type=float,
+                            help='Falla si el arranque en frío (settings + apps + urls) supera estos ms. Útil en CI.')
+
+    def handle(self, *args, **options):
+        resultado = subprocess.run(
+            [sys.executable, '-c', MEDIR_ARRANQUE],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if resultado.returncode != 0:
+            raise CommandError(f"No se pudo medir el arranque:\n{resultado.stderr}")
+        ms_settings, ms_apps, ms_urls = map(float, resultado.stdout.split()[-3:])
+        arranque = ms_settings + ms_apps + ms_urls
+
+        self.stdout.write("Arranque en frío:")
+        self.stdout.write(f"  config.settings   {ms_settings:8,.0f} ms")
+        self.stdout.write(f"  django.setup()    {ms_apps:8,.0f} ms")
+        self.stdout.write(f"  urlpatterns       {ms_urls:8,.0f} ms")
+
+        self.stdout.write("Warm-up:")
+        tiempos = calentar()
+        for nombre, ms in tiempos.items():
+            self.stdout.write(f"  {nombre:<17} {ms:8,.0f} ms")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Operación completada. Arranque {arranque:,.0f} ms, warm-up {sum(tiempos.values()):,.0f} ms."
+        ))
+        if options['umbral_ms'] and arranque > options['umbral_ms']:
+            raise CommandError(f"El arranque ({arranque:,.0f} ms) supera el umbral de {options['umbral_ms']:,.0f} ms.")
@@ -0,0 +1,178 @@
+import mimetypes
+import os
+import stat as stat_mod
+from urllib.parse import quote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from .asincrono import iterar_async
+from .storage import es_blob, es_inmutable, version_archivo
+
+MAX_AGE_INMUTABLE = 60 * 60 * 24 * 365
+MAX_AGE_MEDIA = 60 * 60
+TAMANO_BLOQUE = 64 * 1024
+
+
+def _leer_rango(archivo, inicio, largo):
+    with archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def parsear_rango(cabecera, tamano):
+    """
+    Devuelve (inicio, fin) inclusivo, None si la cabecera no aplica (se envía
+    el archivo completo) o False si el rango no es satisfacible (416). Los
+    rangos múltiples se ignoran: el RFC permite responder con el archivo entero.
+    """
+    if not cabecera or not cabecera.startswith('bytes=') or ',' in cabecera:
+        return None
+    inicio, _, fin = cabecera[6:].strip().partition('-')
+    try:
+        if not inicio:
+            sufijo = int(fin)
+            if sufijo <= 0:
+                return False
+            return max(tamano - sufijo, 0), tamano - 1
+        inicio = int(inicio)
+        fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    except ValueError:
+        return None
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, fin
+
+
+class MediaMiddleware:
+    """
+    Sirve MEDIA_URL en producción, antes del resto del stack (como WhiteNoise
+    con los estáticos): sin sesión ni CSRF. Los blobs y sus rendiciones llevan
+    el hash en el nombre y se cachean como inmutables; las subidas antiguas
+    solo cuando la URL trae su ?v= vigente. Soporta ETag/If-None-Match,
+    Last-Modified y Range. Con MEDIA_ENVIO = 'x-accel' o 'x-sendfile' el envío
+    del archivo lo hace nginx/Apache y el worker queda libre de inmediato.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefijo = settings.MEDIA_URL
+        self.raiz = str(settings.MEDIA_ROOT)
+        self.envio = settings.MEDIA_ENVIO
+        self.prefijo_interno = settings.MEDIA_ENVIO_PREFIJO
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def _nombre(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefijo):
+            return request.path_info[len(self.prefijo):]
+        return None
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        nombre = self._nombre(request)
+        if nombre is not None:
+            respuesta = self.servir(request, nombre)
+            if respuesta is not None:
+                return respuesta
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Solo /media/ pasa por un hilo (stat y apertura del archivo); el resto sigue async
+        nombre = self._nombre(request)
+        if nombre is not None:
+            respuesta = await sync_to_async(self.servir, thread_sensitive=False)(request, nombre)
+            if respuesta is not None:
+                return respuesta
+        return await self.get_response(request)
+
+    def servir(self, request, nombre):
+        try:
+            ruta = safe_join(self.raiz, nombre)
+            stat = os.stat(ruta)
+        except (SuspiciousFileOperation, OSError, ValueError):
+            return None
+        if not stat_mod.S_ISREG(stat.st_mode):
+            return None
+
+        version = version_archivo(stat)
+        if es_blob(nombre):
+            etag = '"%s"' % os.path.splitext(os.path.basename(nombre))[0]
+        else:
+            etag = '"%s"' % version
+        if es_inmutable(nombre) or request.GET.get('v') == version:
+            cache_control = f'public, max-age={MAX_AGE_INMUTABLE}, immutable'
+        else:
+            cache_control = f'public, max-age={MAX_AGE_MEDIA}'
+        cabeceras = {
+            'ETag': etag,
+            'Last-Modified': http_date(stat.st_mtime),
+            'Cache-Control': cache_control,
+        }
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = [e.removeprefix('W/') for e in parse_etags(if_none_match)]
+            no_modificado = etag in etags or '*' in etags
+        else:
+            desde = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+            no_modificado = desde is not None and int(stat.st_mtime) <= desde
+        if no_modificado:
+            return self._con_cabeceras(HttpResponseNotModified(), cabeceras)
+
+        tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+        if self.envio == 'x-accel':
+            # nginx resuelve Range y condicionales sobre la location interna
+            respuesta = HttpResponse(content_type=tipo)
+            respuesta['X-Accel-Redirect'] = quote(self.prefijo_interno + nombre)
+            return self._con_cabeceras(respuesta, cabeceras)
+        if self.envio == 'x-sendfile':
+            respuesta = HttpResponse(content_type=tipo)
+            respuesta['X-Sendfile'] = ruta
+            return self._con_cabeceras(respuesta, cabeceras)
+
+        cabeceras['Accept-Ranges'] = 'bytes'
+        rango = parsear_rango(request.META.get('HTTP_RANGE'), stat.st_size)
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if rango is not None and if_range and if_range not in (etag, cabeceras['Last-Modified']):
+            rango = None
+        if rango is False:
+            respuesta = HttpResponse(status=416)
+            respuesta['Content-Range'] = f'bytes */{stat.st_size}'
+            return self._con_cabeceras(respuesta, cabeceras)
+        es_asgi = isinstance(request, ASGIRequest)
+        if rango is None and not es_asgi:
+            # FileResponse usa wsgi.file_wrapper (sendfile del kernel) cuando el servidor lo ofrece
+            respuesta = FileResponse(open(ruta, 'rb'), content_type=tipo)
+            return self._con_cabeceras(respuesta, cabeceras)
+
+        inicio, fin = rango or (0, stat.st_size - 1)
+        largo = fin - inicio + 1
+        cuerpo = _leer_rango(open(ruta, 'rb'), inicio, largo)
+        if es_asgi:
+            cuerpo = iterar_async(cuerpo, thread_sensitive=False)
+        respuesta = StreamingHttpResponse(cuerpo, status=206 if rango else 200, content_type=tipo)
+        if rango:
+            respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{stat.st_size}'
+        respuesta['Content-Length'] = largo
+        return self._con_cabeceras(respuesta, cabeceras)
+
+    @staticmethod
+    def _con_cabeceras(respuesta, cabeceras):
+        for nombre, valor in cabeceras.items():
+            respuesta[nombre] = valor
+        return respuesta
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-19 02:50
+
+import django.core.validators
+import propiedades.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0002_propiedad_url_terrastudio_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(db_index=True, max_length=64)),
+                ('archivo', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('referencias', models.IntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Blob de Media',
+                'verbose_name_plural': 'Blobs de Media',
+            },
+        ),
+        migrations.AlterField(
+            model_name='imagenpropiedad',
+            name='imagen',
+            field=models.ImageField(storage=propiedades.storage.AlmacenamientoDeduplicado(), upload_to='propiedades/%Y/%m/', validators=[django.core.validators.FileExtensionValidator(['jpg', 'jpeg', 'png', 'webp'])]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0003_blobmedia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenpropiedad',
+            name='alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagenpropiedad',
+            name='ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='imagenpropiedad',
+            name='color_dominante',
+            field=models.CharField(blank=True, editable=False, max_length=7),
+        ),
+        migrations.AddField(
+            model_name='imagenpropiedad',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, help_text='Miniatura WebP de ~20px (data URI) para carga progresiva'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0004_imagenpropiedad_placeholder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioPublicacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('PROPIEDAD', 'Propiedad'), ('IMAGEN', 'Imagen')], max_length=10)),
+                ('accion', models.CharField(choices=[('CREADO', 'Creado'), ('ACTUALIZADO', 'Actualizado'), ('ELIMINADO', 'Eliminado')], max_length=12)),
+                ('objeto_id', models.BigIntegerField()),
+                ('propiedad_id', models.BigIntegerField(db_index=True)),
+                ('id_ficha', models.CharField(blank=True, max_length=20)),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cambio de Publicación',
+                'verbose_name_plural': 'Cambios de Publicación',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 04:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0005_cambiopublicacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoEnlace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(max_length=40)),
+                ('url', models.URLField(max_length=500)),
+                ('estado', models.CharField(choices=[('OK', 'OK'), ('ROTO', 'Roto'), ('BLOQUEADO', 'Bloqueado / requiere login'), ('ERROR', 'Sin respuesta')], max_length=10)),
+                ('codigo_http', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Código HTTP')),
+                ('detalle', models.CharField(blank=True, max_length=255)),
+                ('latencia_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Latencia (ms)')),
+                ('revisado', models.DateTimeField(verbose_name='Última revisión')),
+                ('propiedad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estados_enlace', to='propiedades.propiedad')),
+            ],
+            options={
+                'verbose_name': 'Estado de Enlace',
+                'verbose_name_plural': 'Estados de Enlaces',
+                'ordering': ['propiedad', 'campo'],
+                'constraints': [models.UniqueConstraint(fields=('propiedad', 'campo'), name='estado_enlace_unico')],
+            },
+        ),
+    ]
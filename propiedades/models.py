@@ -1,15 +1,18 @@
 from django.db import models
 from django.utils.text import slugify
 from django.core.validators import FileExtensionValidator
-from django.db.models.signals import post_delete, pre_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from multiselectfield import MultiSelectField
 import os
-import requests
 from decimal import Decimal
 import datetime
 from django.urls import reverse
+from .storage import almacenamiento_media, es_blob
+from .imagenes import analizar_imagen
+from .uf import obtener_valor_uf
 
 TIPO_OPERACION = [('VENTA', 'Venta'), ('ARRIENDO', 'Arriendo')]
 TIPO_MONEDA = [('UF', 'UF'), ('CLP', 'Pesos Chilenos (CLP)')]
@@ -45,6 +48,13 @@ TIPO_ALCANTARILLADO = [
     ('INSTALADO', 'Instalado'), ('ACCESO_RED', 'Acceso a Red'),
     ('FOSA', 'Fosa Séptica'), ('NO_TIENE', 'No tiene')
 ]
+ACCION_CAMBIO = [('CREADO', 'Creado'), ('ACTUALIZADO', 'Actualizado'), ('ELIMINADO', 'Eliminado')]
+MODELO_CAMBIO = [('PROPIEDAD', 'Propiedad'), ('IMAGEN', 'Imagen')]
+ESTADO_ENLACE = [
+    ('OK', 'OK'), ('ROTO', 'Roto'),
+    ('BLOQUEADO', 'Bloqueado / requiere login'), ('ERROR', 'Sin respuesta')
+]
+
 TOPOGRAFIA = [
     ('PLANO', 'Plano'), ('PENDIENTE_SUAVE', 'Pendiente Suave'),
     ('PENDIENTE_FUERTE', 'Pendiente Fuerte'), ('MIXTO', 'Mixto'), ('IRREGULAR', 'Irregular')
@@ -140,12 +150,7 @@ class Propiedad(models.Model):
         ordering = ['-creado']
 
     def _obtener_valor_uf(self):
-        try:
-            response = requests.get('https://mindicador.cl/api/uf', timeout=3)
-            if response.status_code == 200:
-                return Decimal(str(response.json()['serie'][0]['valor']))
-        except: pass
-        return Decimal('38000')
+        return obtener_valor_uf()
 
     def save(self, *args, **kwargs):
         if not self.id_ficha:
@@ -159,8 +164,6 @@ class Propiedad(models.Model):
                 except: pass
             self.id_ficha = f"TS-{nuevo_num:04d}"
 
-        super().save(*args, **kwargs)
-
         if not self.slug:
             titulo_limpio = slugify(self.titulo)[:50]
             self.slug = slugify(f"{self.id_ficha}-{titulo_limpio}")
@@ -188,8 +191,13 @@ class Propiedad(models.Model):
     
     @property
     def imagen_principal(self):
-        img = self.imagenes.filter(es_principal=True).first()
-        return img if img else self.imagenes.first()
+        # Usa imagenes.all() para aprovechar prefetch_related (obligatorio en las vistas async)
+        imagenes = list(self.imagenes.all())
+        return next((img for img in imagenes if img.es_principal), imagenes[0] if imagenes else None)
+
+    @property
+    def placeholders_galeria(self):
+        return {img.imagen.url: img.placeholder for img in self.imagenes.all() if img.placeholder}
     
     def __str__(self):
         return f"{self.id_ficha} | {self.titulo}"
@@ -210,22 +218,166 @@ class Propiedad(models.Model):
 
 class ImagenPropiedad(models.Model):
     propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name='imagenes')
-    imagen = models.ImageField(upload_to='propiedades/%Y/%m/', validators=[FileExtensionValidator(['jpg', 'jpeg', 'png', 'webp'])])
+    imagen = models.ImageField(upload_to='propiedades/%Y/%m/', storage=almacenamiento_media, validators=[FileExtensionValidator(['jpg', 'jpeg', 'png', 'webp'])])
     titulo = models.CharField(max_length=200, blank=True)
     alt_text = models.CharField(max_length=255, blank=True)
     es_principal = models.BooleanField(default=False)
     orden = models.PositiveSmallIntegerField(default=0)
     subido_en = models.DateTimeField(auto_now_add=True)
 
+    ancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    alto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    color_dominante = models.CharField(max_length=7, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False, help_text="Miniatura WebP de ~20px (data URI) para carga progresiva")
+
     class Meta:
         ordering = ['-es_principal', 'orden', 'subido_en']
 
+    def calcular_placeholder(self):
+        try:
+            datos = analizar_imagen(self.imagen)
+        except (OSError, ValueError):
+            return False
+        finally:
+            # Un archivo ya guardado se abre desde el storage solo para analizarlo
+            if self.imagen._committed:
+                self.imagen.close()
+        for campo, valor in datos.items():
+            setattr(self, campo, valor)
+        return True
+
     def save(self, *args, **kwargs):
         if not self.alt_text: self.alt_text = self.titulo or f"Img {self.propiedad.titulo}"
+        # Solo al subir: las fotos antiguas o que fallaron se completan con generar_placeholders
+        if self.imagen and not self.imagen._committed:
+            self.calcular_placeholder()
         if self.es_principal:
-            ImagenPropiedad.objects.filter(propiedad=self.propiedad, es_principal=True).exclude(pk=self.pk).update(es_principal=False)
+            anteriores = ImagenPropiedad.objects.filter(propiedad=self.propiedad, es_principal=True).exclude(pk=self.pk)
+            ids = list(anteriores.values_list('pk', flat=True))
+            if ids:
+                ImagenPropiedad.objects.filter(pk__in=ids).update(es_principal=False)
+                # update() no dispara señales: se registra el cambio para el feed de portales
+                CambioPublicacion.objects.bulk_create([
+                    CambioPublicacion(modelo='IMAGEN', accion='ACTUALIZADO', objeto_id=pk, propiedad_id=self.propiedad_id)
+                    for pk in ids
+                ])
         super().save(*args, **kwargs)
 
+
+
+class BlobMedia(models.Model):
+    """Archivo único en disco (por contenido) y cuántas imágenes lo usan."""
+    hash = models.CharField(max_length=64, db_index=True)
+    archivo = models.CharField(max_length=255, unique=True)
+    tamano = models.PositiveBigIntegerField(default=0)
+    referencias = models.IntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Blob de Media"
+        verbose_name_plural = "Blobs de Media"
+
+    def __str__(self):
+        return f"{self.archivo} ({self.referencias} ref.)"
+
+    @classmethod
+    def sumar_referencia(cls, nombre):
+        if not es_blob(nombre): return
+        hash_hex = os.path.splitext(os.path.basename(nombre))[0]
+        tamano = almacenamiento_media.size(nombre) if almacenamiento_media.exists(nombre) else 0
+        blob, _ = cls.objects.get_or_create(archivo=nombre, defaults={'hash': hash_hex, 'tamano': tamano})
+        cls.objects.filter(pk=blob.pk).update(referencias=F('referencias') + 1)
+
+    @classmethod
+    def restar_referencia(cls, nombre):
+        # El archivo no se borra aquí: lo recoge `manage.py limpiar_media`
+        if not es_blob(nombre): return
+        cls.objects.filter(archivo=nombre, referencias__gt=0).update(referencias=F('referencias') - 1)
+
+
+@receiver(pre_save, sender=ImagenPropiedad)
+def recordar_archivo_anterior(sender, instance, **kwargs):
+    instance._imagen_anterior = None
+    if instance.pk:
+        instance._imagen_anterior = sender.objects.filter(pk=instance.pk).values_list('imagen', flat=True).first()
+
+@receiver(post_save, sender=ImagenPropiedad)
+def actualizar_referencias(sender, instance, created, raw=False, **kwargs):
+    if raw: return
+    anterior = getattr(instance, '_imagen_anterior', None)
+    actual = instance.imagen.name if instance.imagen else None
+    if created or anterior != actual:
+        if actual: BlobMedia.sumar_referencia(actual)
+        if anterior: BlobMedia.restar_referencia(anterior)
+
+@receiver(post_delete, sender=ImagenPropiedad)
+def liberar_archivo(sender, instance, **kwargs):
+    if instance.imagen: BlobMedia.restar_referencia(instance.imagen.name)
+
+
+class EstadoEnlace(models.Model):
+    """Resultado de la última revisión de cada link de una propiedad (`manage.py revisar_enlaces`)."""
+    propiedad = models.ForeignKey(Propiedad, on_delete=models.CASCADE, related_name='estados_enlace')
+    campo = models.CharField(max_length=40)
+    url = models.URLField(max_length=500)
+    estado = models.CharField(max_length=10, choices=ESTADO_ENLACE)
+    codigo_http = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Código HTTP")
+    detalle = models.CharField(max_length=255, blank=True)
+    latencia_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name="Latencia (ms)")
+    revisado = models.DateTimeField(verbose_name="Última revisión")
+
+    class Meta:
+        verbose_name = "Estado de Enlace"
+        verbose_name_plural = "Estados de Enlaces"
+        ordering = ['propiedad', 'campo']
+        constraints = [models.UniqueConstraint(fields=['propiedad', 'campo'], name='estado_enlace_unico')]
+
+    def __str__(self):
+        return f"{self.propiedad.id_ficha} · {self.campo}: {self.get_estado_display()}"
+
+
+class CambioPublicacion(models.Model):
+    """Registro append-only de cambios; su id es el cursor `since` del feed de sindicación."""
+    modelo = models.CharField(max_length=10, choices=MODELO_CAMBIO)
+    accion = models.CharField(max_length=12, choices=ACCION_CAMBIO)
+    objeto_id = models.BigIntegerField()
+    # Sin FK: el registro debe sobrevivir al borrado de la propiedad
+    propiedad_id = models.BigIntegerField(db_index=True)
+    id_ficha = models.CharField(max_length=20, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Cambio de Publicación"
+        verbose_name_plural = "Cambios de Publicación"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_accion_display()} {self.get_modelo_display()} {self.objeto_id}"
+
+
+@receiver(post_save, sender=Propiedad)
+def registrar_cambio_propiedad(sender, instance, created, raw=False, **kwargs):
+    if raw: return
+    CambioPublicacion.objects.create(
+        modelo='PROPIEDAD', accion='CREADO' if created else 'ACTUALIZADO',
+        objeto_id=instance.pk, propiedad_id=instance.pk, id_ficha=instance.id_ficha,
+    )
+
+@receiver(post_delete, sender=Propiedad)
+def registrar_baja_propiedad(sender, instance, **kwargs):
+    CambioPublicacion.objects.create(
+        modelo='PROPIEDAD', accion='ELIMINADO',
+        objeto_id=instance.pk, propiedad_id=instance.pk, id_ficha=instance.id_ficha,
+    )
+
+@receiver(post_save, sender=ImagenPropiedad)
+def registrar_cambio_imagen(sender, instance, created, raw=False, **kwargs):
+    if raw: return
+    CambioPublicacion.objects.create(
+        modelo='IMAGEN', accion='CREADO' if created else 'ACTUALIZADO',
+        objeto_id=instance.pk, propiedad_id=instance.propiedad_id,
+    )
+
 @receiver(post_delete, sender=ImagenPropiedad)
-def eliminar_archivo(sender, instance, **kwargs):
-    if instance.imagen and os.path.isfile(instance.imagen.path): os.remove(instance.imagen.path)
\ No newline at end of file
+def registrar_baja_imagen(sender, instance, **kwargs):
+    CambioPublicacion.objects.create(modelo='IMAGEN', accion='ELIMINADO', objeto_id=instance.pk, propiedad_id=instance.propiedad_id)
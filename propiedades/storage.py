@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+PREFIJO_BLOBS = 'blobs'
+PREFIJO_RENDICIONES = 'rendiciones'
+# Carpetas de MEDIA_ROOT administradas por la app (incluye las subidas antiguas sin deduplicar)
+CARPETAS_GESTIONADAS = (PREFIJO_BLOBS, PREFIJO_RENDICIONES, 'propiedades')
+
+
+def calcular_hash(contenido):
+    sha = hashlib.sha256()
+    for chunk in contenido.chunks():
+        sha.update(chunk)
+    contenido.seek(0)
+    return sha.hexdigest()
+
+
+def nombre_blob(hash_hex, extension):
+    # Dos niveles de carpetas para no dejar miles de archivos en un mismo directorio
+    return f"{PREFIJO_BLOBS}/{hash_hex[:2]}/{hash_hex[2:4]}/{hash_hex}{extension.lower()}"
+
+
+def es_blob(nombre):
+    return bool(nombre) and nombre.startswith(f"{PREFIJO_BLOBS}/")
+
+
+def nombre_original(nombre):
+    """Para una rendición devuelve el archivo del que deriva; si no, el mismo nombre."""
+    if nombre.startswith(f"{PREFIJO_RENDICIONES}/"):
+        return nombre[len(PREFIJO_RENDICIONES) + 1:].rsplit('/', 1)[0]
+    return nombre
+
+
+def es_inmutable(nombre):
+    """Los blobs (y sus rendiciones) nunca cambian de contenido sin cambiar de nombre."""
+    return es_blob(nombre_original(nombre))
+
+
+def version_archivo(stat):
+    """Huella corta de un archivo sin hash en el nombre (subidas antiguas)."""
+    return hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}".encode()).hexdigest()[:12]
+
+
+@deconstructible
+class AlmacenamientoDeduplicado(FileSystemStorage):
+    """
+    Guarda cada archivo según el SHA-256 de su contenido. Si la misma foto se
+    sube a varios lotes, el archivo se escribe una sola vez y todos los
+    registros apuntan al mismo blob. El conteo de referencias vive en BlobMedia.
+    """
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1]
+        nombre = nombre_blob(calcular_hash(content), extension)
+        if self.exists(nombre):
+            # Se renueva la fecha para que limpiar_media respete el periodo de gracia
+            os.utime(self.path(nombre))
+            return nombre
+        return super()._save(nombre, content)
+
+    def url(self, name):
+        url = super().url(name)
+        if name and not es_inmutable(name):
+            # ?v= cambia si el archivo cambia, así también se puede cachear como inmutable
+            try:
+                url += f"?v={version_archivo(os.stat(self.path(name)))}"
+            except OSError:
+                pass
+        return url
+
+
+almacenamiento_media = AlmacenamientoDeduplicado()
@@ -0,0 +1,70 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+from propiedades.estaticos import FORMATOS, cargar_variantes
+
+register = template.Library()
+
+# Ancho máximo que se usa para imágenes de fondo (no admiten srcset)
+ANCHO_FONDO = 1600
+
+
+def _url_variante(nombre):
+    """URL de una variante, o None si no está en el manifiesto de collectstatic (se generó después)."""
+    try:
+        return static(nombre)
+    except ValueError:
+        return None
+
+
+def _fuentes(info, formato):
+    return [(ancho, url) for ancho, nombre in info['variantes'].get(formato, []) if (url := _url_variante(nombre))]
+
+
+@register.simple_tag
+def imagen_optimizada(ruta, alt='', sizes='100vw', **atributos):
+    """
+    Emite <picture> con las variantes AVIF/WebP de `ruta` y la imagen original
+    como respaldo. Sin `optimizar_estaticos` corrido, emite un <img> normal.
+    """
+    info = cargar_variantes().get(ruta)
+    extra = format_html_join('', ' {}="{}"', ((k.replace('_', '-'), v) for k, v in atributos.items()))
+    srcsets = {}
+    if info:
+        srcsets = {formato: fuentes for formato in FORMATOS if (fuentes := _fuentes(info, formato))}
+    if not srcsets:
+        return format_html('<img src="{}" alt="{}"{}>', static(ruta), alt, extra)
+
+    fuentes = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (formato, ', '.join(f"{url} {ancho}w" for ancho, url in candidatas), sizes)
+            for formato, candidatas in srcsets.items()
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" width="{}" height="{}"{}></picture>',
+        fuentes, static(ruta), alt, info['ancho'], info['alto'], extra,
+    )
+
+
+@register.simple_tag
+def fondo_optimizado(ruta):
+    """Declaraciones CSS `background-image` con image-set() para AVIF/WebP y respaldo al original."""
+    declaracion = format_html("background-image: url('{}');", static(ruta))
+    info = cargar_variantes().get(ruta)
+    if not info:
+        return declaracion
+
+    opciones = []
+    for formato in FORMATOS:
+        candidatas = [url for ancho, url in _fuentes(info, formato) if ancho <= ANCHO_FONDO]
+        if candidatas:
+            opciones.append(format_html("url('{}') type('image/{}')", candidatas[-1], formato))
+    if not opciones:
+        return declaracion
+    # La primera declaración queda como respaldo para navegadores sin image-set()
+    return format_html(
+        "{} background-image: image-set({});",
+        declaracion, format_html_join(', ', '{}', ((o,) for o in opciones)),
+    )
@@ -1 +1,380 @@
-from django.test import TestCase
\ No newline at end of file
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from xml.etree import ElementTree
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .enlaces import RevisorEnlaces
+from .estaticos import EstaticosMiddleware
+from .facetas import obtener_facetas
+from .management.commands.limpiar_media import Command as LimpiarMedia
+from .media import MediaMiddleware
+from .models import BlobMedia, CambioPublicacion, ImagenPropiedad, Propiedad
+from .templatetags.optimizadas import fondo_optimizado, imagen_optimizada
+from .uf import CLAVE_CACHE_UF
+
+CACHE_PRUEBAS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+HACE_DOS_DIAS = time.time() - 48 * 3600
+
+
+def foto(color='red', nombre='foto.jpg'):
+    salida = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(salida, 'JPEG')
+    return SimpleUploadedFile(nombre, salida.getvalue(), content_type='image/jpeg')
+
+
+def crear_propiedad(**campos):
+    propiedad = Propiedad(**{'titulo': 'Parcela de prueba', 'precio_lista': 1000, 'superficie_total_m2': 5000, 'descripcion': '-', **campos})
+    propiedad.save()
+    return propiedad
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class MediaTestCase(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache.clear()
+        cache.set(CLAVE_CACHE_UF, Decimal('38000'))
+        self.propiedad = crear_propiedad()
+
+    def ruta(self, nombre):
+        return os.path.join(self.media, nombre)
+
+
+class ReferenciasBlobTests(MediaTestCase):
+    def test_misma_foto_comparte_blob(self):
+        a = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto())
+        b = ImagenPropiedad.objects.create(propiedad=crear_propiedad(), imagen=foto(nombre='otra.jpg'))
+        self.assertEqual(a.imagen.name, b.imagen.name)
+        self.assertTrue(a.imagen.name.startswith('blobs/'))
+        self.assertEqual(BlobMedia.objects.get(archivo=a.imagen.name).referencias, 2)
+
+        a.delete()
+        self.assertEqual(BlobMedia.objects.get(archivo=b.imagen.name).referencias, 1)
+        b.delete()
+        self.assertEqual(BlobMedia.objects.get(archivo=b.imagen.name).referencias, 0)
+        # El borrado solo descuenta: el archivo lo recoge limpiar_media
+        self.assertTrue(os.path.exists(self.ruta(b.imagen.name)))
+
+    def test_reemplazar_foto_mueve_la_referencia(self):
+        imagen = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto('red'))
+        anterior = imagen.imagen.name
+        imagen.imagen = foto('blue')
+        imagen.save()
+        self.assertNotEqual(imagen.imagen.name, anterior)
+        self.assertEqual(BlobMedia.objects.get(archivo=anterior).referencias, 0)
+        self.assertEqual(BlobMedia.objects.get(archivo=imagen.imagen.name).referencias, 1)
+
+
+class PlaceholderTests(MediaTestCase):
+    def test_se_calcula_al_subir(self):
+        imagen = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto())
+        self.assertEqual((imagen.ancho, imagen.alto), (64, 48))
+        self.assertTrue(imagen.placeholder.startswith('data:image/webp;base64,'))
+
+    def test_guardar_no_vuelve_a_leer_el_archivo(self):
+        imagen = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto())
+        ImagenPropiedad.objects.filter(pk=imagen.pk).update(placeholder='')
+        imagen = ImagenPropiedad.objects.get(pk=imagen.pk)
+        imagen.titulo = 'Vista al valle'
+        imagen.save()
+        self.assertEqual(imagen.placeholder, '')
+
+        call_command('generar_placeholders', stdout=io.StringIO())
+        imagen.refresh_from_db()
+        self.assertTrue(imagen.placeholder)
+
+
+class LimpiarMediaTests(MediaTestCase):
+    def limpiar(self, **opciones):
+        call_command('limpiar_media', stdout=io.StringIO(), **opciones)
+
+    def huerfano(self, color='green'):
+        imagen = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto(color))
+        nombre = imagen.imagen.name
+        imagen.delete()
+        os.utime(self.ruta(nombre), (HACE_DOS_DIAS, HACE_DOS_DIAS))
+        return nombre
+
+    def test_borra_huerfanos_y_conserva_los_usados(self):
+        nombre = self.huerfano()
+        en_uso = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto('blue')).imagen.name
+        os.utime(self.ruta(en_uso), (HACE_DOS_DIAS, HACE_DOS_DIAS))
+
+        self.limpiar()
+        self.assertFalse(os.path.exists(self.ruta(nombre)))
+        self.assertFalse(BlobMedia.objects.filter(archivo=nombre).exists())
+        self.assertTrue(os.path.exists(self.ruta(en_uso)))
+
+    def test_dry_run_no_borra(self):
+        nombre = self.huerfano()
+        self.limpiar(dry_run=True)
+        self.assertTrue(os.path.exists(self.ruta(nombre)))
+
+    def test_respeta_periodo_de_gracia(self):
+        nombre = self.huerfano()
+        os.utime(self.ruta(nombre))
+        self.limpiar()
+        self.assertTrue(os.path.exists(self.ruta(nombre)))
+
+    def test_no_borra_blob_reutilizado_durante_el_recorrido(self):
+        nombre = self.huerfano()
+        comando = LimpiarMedia(stdout=io.StringIO())
+        comando.dry_run = False
+        comando.limite = time.time() - 24 * 3600
+        comando.borrados = comando.liberado = 0
+        # procesar_lote ya lo vio viejo; una subida del mismo contenido le renueva la fecha
+        os.utime(self.ruta(nombre))
+        comando.borrar(self.ruta(nombre), nombre, 0)
+        self.assertTrue(os.path.exists(self.ruta(nombre)))
+
+
+class CambioPublicacionTests(MediaTestCase):
+    def cambios(self, **filtros):
+        return list(CambioPublicacion.objects.filter(**filtros).values_list('modelo', 'accion', 'objeto_id'))
+
+    def test_un_registro_por_guardado(self):
+        propiedad = Propiedad.objects.create(titulo='Sitio', precio_lista=500, superficie_total_m2=300, descripcion='-')
+        propiedad.titulo = 'Sitio urbano'
+        propiedad.save()
+        self.assertEqual(self.cambios(propiedad_id=propiedad.pk), [
+            ('PROPIEDAD', 'CREADO', propiedad.pk), ('PROPIEDAD', 'ACTUALIZADO', propiedad.pk),
+        ])
+
+    def test_registra_la_principal_anterior(self):
+        primera = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto('red'), es_principal=True)
+        CambioPublicacion.objects.all().delete()
+        segunda = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto('blue'), es_principal=True)
+        primera.refresh_from_db()
+        self.assertFalse(primera.es_principal)
+        self.assertEqual(self.cambios(), [('IMAGEN', 'ACTUALIZADO', primera.pk), ('IMAGEN', 'CREADO', segunda.pk)])
+
+
+class FeedCambiosTests(MediaTestCase):
+    @override_settings(FEED_TOKEN=None)
+    def test_sin_token_configurado_no_se_expone(self):
+        self.assertEqual(self.client.get(reverse('feed_cambios_json')).status_code, 403)
+
+    @override_settings(FEED_TOKEN='secreto')
+    def test_exige_token(self):
+        url = reverse('feed_cambios_json')
+        self.assertEqual(self.client.get(url, {'token': 'otro'}).status_code, 403)
+        respuesta = self.client.get(url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(self.propiedad.id_ficha, b''.join(respuesta.streaming_content).decode())
+
+    @override_settings(FEED_TOKEN='secreto')
+    def test_xml_descarta_caracteres_de_control(self):
+        crear_propiedad(descripcion='Vista\x0bal mar\x1f')
+        respuesta = self.client.get(reverse('feed_cambios_xml'), {'token': 'secreto'})
+        documento = ElementTree.fromstring(b''.join(respuesta.streaming_content))
+        self.assertIn('<descripcion>Vistaal mar</descripcion>', ElementTree.tostring(documento, encoding='unicode'))
+        self.assertEqual(documento.find('siguiente').get('hay_mas'), 'false')
+
+
+class FacetasTests(MediaTestCase):
+    def claves_facetas(self):
+        return [clave for clave in cache._cache if ':facetas:catalogo:' in clave and not clave.endswith(':sectores')]
+
+    def test_sector_desconocido_no_se_cachea(self):
+        crear_propiedad(sector='Dichato')
+        qs = Propiedad.objects.all()
+        obtener_facetas(qs, {'sector': 'Dichato'})
+        self.assertEqual(len(self.claves_facetas()), 1)
+
+        facetas = obtener_facetas(qs, {'sector': 'no-existe'})
+        self.assertEqual(len(self.claves_facetas()), 1)
+        self.assertIn({'valor': 'no-existe', 'etiqueta': 'no-existe', 'n': 0}, facetas['sector'])
+
+
+class MediaMiddlewareTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.nombre = ImagenPropiedad.objects.create(propiedad=self.propiedad, imagen=foto()).imagen.name
+        self.url = '/media/' + self.nombre
+        with open(self.ruta(self.nombre), 'rb') as f:
+            self.contenido = f.read()
+
+    def test_blob_inmutable_y_condicional(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('immutable', respuesta['Cache-Control'])
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+    def test_rangos(self):
+        respuesta = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(respuesta['Content-Range'], f'bytes 10-19/{len(self.contenido)}')
+        self.assertEqual(b''.join(respuesta.streaming_content), self.contenido[10:20])
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.contenido)}-').status_code, 416)
+
+    async def test_asgi_transmite_sin_acumular(self):
+        for rango, esperado in ((None, self.contenido), ('bytes=-5', self.contenido[-5:])):
+            extra = {'headers': {'Range': rango}} if rango else {}
+            respuesta = await self.async_client.get(self.url, **extra)
+            self.assertTrue(respuesta.is_async)
+            self.assertEqual(b''.join([parte async for parte in respuesta.streaming_content]), esperado)
+
+    async def test_modo_async_sin_hilo_fuera_de_media(self):
+        async def vista(request):
+            return HttpResponse('vista')
+
+        middleware = MediaMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with mock.patch('propiedades.media.sync_to_async') as hilo:
+            respuesta = await middleware(AsyncRequestFactory().get('/catalogo/'))
+        hilo.assert_not_called()
+        self.assertEqual(respuesta.content, b'vista')
+
+    @override_settings(MEDIA_ENVIO='x-accel')
+    def test_x_accel_escapa_la_ruta(self):
+        os.makedirs(self.ruta('propiedades/2024/05'))
+        with open(self.ruta('propiedades/2024/05/año ñuble.jpg'), 'wb') as f:
+            f.write(b'jpg')
+        respuesta = self.client.get('/media/propiedades/2024/05/año ñuble.jpg')
+        self.assertEqual(respuesta['X-Accel-Redirect'], '/media-interna/propiedades/2024/05/a%C3%B1o%20%C3%B1uble.jpg')
+        self.assertEqual(respuesta['Cache-Control'], 'public, max-age=3600')
+
+
+class EstaticosMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        os.makedirs(os.path.join(raiz, 'css'))
+        with open(os.path.join(raiz, 'css', 'sitio.css'), 'w') as f:
+            f.write('body{}' * 1000)
+        ajustes = override_settings(STATIC_ROOT=raiz, STATICFILES_DIRS=[], DEBUG=False)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        async def vista(request):
+            return HttpResponse('vista')
+        self.middleware = EstaticosMiddleware(vista)
+
+    async def test_modo_async(self):
+        self.assertTrue(iscoroutinefunction(self.middleware))
+        respuesta = await self.middleware(AsyncRequestFactory().get('/static/css/sitio.css'))
+        self.assertTrue(respuesta.is_async)
+        self.assertEqual(b''.join([parte async for parte in respuesta.streaming_content]), b'body{}' * 1000)
+
+        respuesta = await self.middleware(AsyncRequestFactory().get('/catalogo/'))
+        self.assertEqual(respuesta.content, b'vista')
+
+
+class ServidorPrueba(BaseHTTPRequestHandler):
+    """Imita las respuestas de los portales: /ok, /bloqueado, /solo-get, /lento/<s> y 404 para el resto."""
+
+    def responder(self, cuerpo):
+        ruta = self.path
+        if ruta.startswith('/lento/'):
+            time.sleep(float(ruta.rsplit('/', 1)[1]))
+            codigo = 200
+        elif ruta == '/solo-get' and self.command == 'HEAD':
+            codigo = 405
+        else:
+            codigo = {'/ok': 200, '/solo-get': 200, '/bloqueado': 403}.get(ruta, 404)
+        self.send_response(codigo)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(b'ok')
+
+    def do_HEAD(self):
+        self.responder(cuerpo=False)
+
+    def do_GET(self):
+        self.responder(cuerpo=True)
+
+    def log_message(self, *args):
+        pass
+
+
+class RevisorEnlacesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), ServidorPrueba)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.servidor.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def test_clasifica_respuestas(self):
+        revisor = RevisorEnlaces(hilos=4, por_host=2, timeout=0.5)
+        resultados = revisor.revisar(self.base + ruta for ruta in ('/ok', '/no-existe', '/bloqueado', '/solo-get', '/lento/2'))
+        estados = {url.removeprefix(self.base): (r['estado'], r['codigo_http']) for url, r in resultados.items()}
+        self.assertEqual(estados, {
+            '/ok': ('OK', 200),
+            '/no-existe': ('ROTO', 404),
+            '/bloqueado': ('BLOQUEADO', 403),
+            '/solo-get': ('OK', 200),
+            '/lento/2': ('ERROR', None),
+        })
+        self.assertIn('0.5s', resultados[self.base + '/lento/2']['detalle'])
+
+    def test_latencia_no_incluye_la_espera_por_host(self):
+        revisor = RevisorEnlaces(hilos=2, por_host=1, timeout=5)
+        resultados = revisor.revisar([self.base + '/lento/0.3', self.base + '/lento/0.30'])
+        for resultado in resultados.values():
+            self.assertLess(resultado['latencia_ms'], 550)
+
+
+class ImagenOptimizadaTests(SimpleTestCase):
+    VARIANTES = {'img/hero-bg.webp': {'ancho': 4096, 'alto': 2048, 'variantes': {
+        'avif': [[480, 'img/hero-bg.480w.avif'], [960, 'img/hero-bg.960w.avif']],
+        'webp': [[480, 'img/hero-bg.480w.webp'], [960, 'img/hero-bg.960w.webp']],
+    }}}
+
+    def setUp(self):
+        raiz = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, raiz, ignore_errors=True)
+        self.recolectados = {'img/hero-bg.webp': 'img/hero-bg.1.webp'}
+        self.manifiesto = os.path.join(raiz, 'staticfiles.json')
+        almacen = {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'}
+        ajustes = override_settings(STATIC_ROOT=raiz, STORAGES={'default': almacen, 'staticfiles': almacen})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        parche = mock.patch('propiedades.templatetags.optimizadas.cargar_variantes', return_value=self.VARIANTES)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def recolectar(self, **rutas):
+        self.recolectados.update(rutas)
+        with open(self.manifiesto, 'w') as f:
+            json.dump({'version': '1.1', 'paths': self.recolectados}, f)
+
+    def test_variantes_sin_recolectar_usan_el_original(self):
+        self.recolectar()
+        self.assertEqual(imagen_optimizada('img/hero-bg.webp', alt='x'), '<img src="/static/img/hero-bg.1.webp" alt="x">')
+        self.assertEqual(fondo_optimizado('img/hero-bg.webp'), "background-image: url('/static/img/hero-bg.1.webp');")
+
+    def test_solo_emite_variantes_recolectadas(self):
+        self.recolectar(**{'img/hero-bg.480w.webp': 'img/hero-bg.480w.2.webp', 'img/hero-bg.960w.webp': 'img/hero-bg.960w.3.webp'})
+        html = imagen_optimizada('img/hero-bg.webp')
+        self.assertNotIn('avif', html)
+        self.assertIn('/static/img/hero-bg.480w.2.webp 480w, /static/img/hero-bg.960w.3.webp 960w', html)
+        self.assertIn("url('/static/img/hero-bg.960w.3.webp') type('image/webp')", fondo_optimizado('img/hero-bg.webp'))
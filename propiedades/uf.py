@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+import requests
+from django.core.cache import cache
+
+URL_API_UF = 'https://mindicador.cl/api/uf'
+CLAVE_CACHE_UF = 'uf:valor'
+# La UF cambia una vez al día: basta con consultarla unas pocas veces por jornada
+DURACION_CACHE_UF = 60 * 60 * 6
+VALOR_UF_RESPALDO = Decimal('38000')
+
+# Sesión compartida: reutiliza la conexión keep-alive con mindicador.cl
+_sesion = requests.Session()
+
+
+def consultar_valor_uf(timeout=3):
+    """Consulta la API y actualiza la caché. Lanza excepción si falla."""
+    response = _sesion.get(URL_API_UF, timeout=timeout)
+    response.raise_for_status()
+    valor = Decimal(str(response.json()['serie'][0]['valor']))
+    cache.set(CLAVE_CACHE_UF, valor, DURACION_CACHE_UF)
+    return valor
+
+
+def obtener_valor_uf():
+    valor = cache.get(CLAVE_CACHE_UF)
+    if valor is not None:
+        return valor
+    try:
+        return consultar_valor_uf()
+    except Exception:
+        return VALOR_UF_RESPALDO
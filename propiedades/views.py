@@ -1,16 +1,34 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, aget_object_or_404, redirect
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import send_mail
 from django.conf import settings
 from django.contrib import messages
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
 from .models import Propiedad
+from .asincrono import iterar_async
+from .feed import generar_json, generar_xml
+from .facetas import aplicar_filtros, leer_filtros, obtener_facetas
 
-def inicio(request):
-    propiedades_destacadas = Propiedad.objects.filter(
+LIMITE_FEED = 1000
+LIMITE_MAXIMO_FEED = 10000
+
+# Las vistas públicas son async: bajo ASGI (ver config/gunicorn_asgi.py) una
+# petición que espera a la BD o al SMTP no bloquea el worker. Las plantillas no
+# pueden consultar la BD desde código async, por eso todo se trae con
+# prefetch_related antes de renderizar.
+
+def propiedades_publicas():
+    return Propiedad.objects.filter(
         estado__in=['DISPONIBLE', 'RESERVADO'],
         esta_publicada=True
     ).exclude(
         plataformas_publicadas__contains='TERRA_WEB'
-    ).order_by('-fecha_ingreso')[:3]
+    ).prefetch_related('imagenes')
+
+async def inicio(request):
+    propiedades_destacadas = [p async for p in propiedades_publicas().order_by('-fecha_ingreso')[:3]]
     
     context = {
         'propiedades': propiedades_destacadas
@@ -18,28 +36,16 @@ def inicio(request):
     return render(request, 'inicio.html', context)
 
 def nosotros(request):
-    propiedades_destacadas = Propiedad.objects.filter(
-        estado__in=['DISPONIBLE', 'RESERVADO'],
-        esta_publicada=True
-    ).exclude(
-        plataformas_publicadas__contains='TERRA_WEB'
-    ).order_by('-fecha_ingreso')[:3]
+    propiedades_destacadas = propiedades_publicas().order_by('-fecha_ingreso')[:3]
     
     return render(request, 'nosotros.html', {'propiedades': propiedades_destacadas})
 
-def catalogo(request):
-    qs_base = Propiedad.objects.filter(
-        estado__in=['DISPONIBLE', 'RESERVADO'],
-        esta_publicada=True
-    ).exclude(
-        plataformas_publicadas__contains='TERRA_WEB'
-    )
-
-    sectores = qs_base.exclude(sector="").values_list('sector', flat=True).distinct().order_by('sector')
+async def catalogo(request):
+    qs_base = propiedades_publicas()
 
-    sector_seleccionado = request.GET.get('sector')
-    if sector_seleccionado:
-        qs_base = qs_base.filter(sector=sector_seleccionado)
+    filtros = leer_filtros(request.GET)
+    facetas = await sync_to_async(obtener_facetas)(qs_base, filtros)
+    qs_base = aplicar_filtros(qs_base, filtros)
 
     orden = request.GET.get('orden')
     
@@ -49,29 +55,26 @@ def catalogo(request):
         propiedades = qs_base.order_by('-precio_uf')
     else:
         propiedades = qs_base.order_by('-fecha_ingreso')
+    propiedades = [p async for p in propiedades]
 
     context = {
         'propiedades': propiedades,
         'is_catalog_page': True,
-        'sectores': sectores,
-        'filtro_sector': sector_seleccionado,
+        'facetas': facetas,
+        'filtros': filtros,
+        'filtro_sector': filtros.get('sector'),
         'filtro_orden': orden,
     }
 
     return render(request, 'propiedades/catalogo.html', context)
 
-def detalle_propiedad(request, slug):
-    propiedad = get_object_or_404(Propiedad, slug=slug)
+async def detalle_propiedad(request, slug):
+    propiedad = await aget_object_or_404(Propiedad.objects.prefetch_related('imagenes'), slug=slug)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return render(request, 'propiedades/detalle_content.html', {'propiedad': propiedad})
     
-    todas_las_propiedades = Propiedad.objects.filter(
-        estado__in=['DISPONIBLE', 'RESERVADO'],
-        esta_publicada=True
-    ).exclude(
-        plataformas_publicadas__contains='TERRA_WEB'
-    ).order_by('-fecha_ingreso')
+    todas_las_propiedades = [p async for p in propiedades_publicas().order_by('-fecha_ingreso')]
     
     context = {
         'propiedades': todas_las_propiedades,
@@ -84,7 +87,7 @@ def detalle_propiedad(request, slug):
 def servicios(request):
     return render(request, 'servicios.html')
 
-def enviar_contacto(request):
+async def enviar_contacto(request):
     if request.method == 'POST':
         categoria = request.POST.get('categoria', 'General')
         canal = request.POST.get('canal', 'Indefinido')
@@ -115,7 +118,8 @@ def enviar_contacto(request):
         """
 
         try:
-            send_mail(
+            # smtplib es bloqueante: se envía en un hilo del pool sin detener el event loop
+            await sync_to_async(send_mail, thread_sensitive=False)(
                 asunto,
                 cuerpo_mensaje,
                 settings.EMAIL_HOST_USER,
@@ -136,4 +140,27 @@ def enviar_contacto(request):
         
         return redirect('inicio') 
     
-    return redirect('inicio')
\ No newline at end of file
+    return redirect('inicio')
+
+def feed_cambios(request, formato):
+    token = settings.FEED_TOKEN
+    # Incluye propiedades no publicadas, con coordenadas: sin token configurado no se expone
+    if not token:
+        return HttpResponseForbidden('Feed deshabilitado: falta configurar FEED_TOKEN.')
+    enviado = request.GET.get('token') or request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not constant_time_compare(enviado, token):
+        return HttpResponseForbidden('Token inválido.')
+
+    try:
+        desde = int(request.GET.get('since', 0))
+        limite = min(int(request.GET.get('limite', LIMITE_FEED)), LIMITE_MAXIMO_FEED)
+    except ValueError:
+        return HttpResponseBadRequest("Los parámetros 'since' y 'limite' deben ser enteros.")
+
+    if formato == 'xml':
+        contenido, tipo = generar_xml(desde, limite, request), 'application/xml; charset=utf-8'
+    else:
+        contenido, tipo = generar_json(desde, limite, request), 'application/json; charset=utf-8'
+    if isinstance(request, ASGIRequest):
+        contenido = iterar_async(contenido)
+    return StreamingHttpResponse(contenido, content_type=tipo)